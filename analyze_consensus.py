@@ -9,18 +9,146 @@ Analyzes delivered.jsonl logs from all nodes to:
 4. Provide statistics on consensus quality
 
 python3 analyze_consensus.py logs
+
+When stdout is not a terminal, a one-line JSON summary is written instead
+of the report.
+
+Requires: msgspec, numpy (optional: numba, for very large logs)
 """
 
-import json
+import hashlib
+import mmap
+import operator
 import os
 import sys
+from array import array
 from pathlib import Path
 from collections import defaultdict
-from typing import Dict, List, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache, reduce
+from typing import Annotated, Dict, List, Optional, Set, Tuple, Union
+
+import msgspec
+import numpy as np
+
+# Below this many compared positions the numpy path is as fast, and
+# importing numba would cost more than the scan saves
+_NUMBA_MIN_LENGTH = 1_000_000
+
+class Delivered(msgspec.Struct):
+    """The fields of a delivered.jsonl entry used by the analysis."""
+    batch_id: Union[int, str]
+    # Bounded to int64 so out-of-range seqs fail to decode like any malformed line
+    seq: Annotated[int, msgspec.Meta(ge=-2**63, le=2**63 - 1)]
+
+_DECODER = msgspec.json.Decoder(Delivered)
+
+@dataclass
+class NodeArrays:
+    """A node's delivery log as parallel int64 arrays, in delivery order.
+    
+    Numeric batch ids are stored as-is. Otherwise batch_ids holds codes
+    into the batch label table returned by load_node_deliveries, so equal
+    codes mean equal batch ids across nodes.
+    """
+    batch_ids: np.ndarray
+    seqs: np.ndarray
+
+def _scan_mismatches(reference, node, out_pos, out_ref, out_node, max_samples):
+    """Count differing positions in one pass, recording the first max_samples."""
+    count = 0
+    for i in range(min(reference.size, node.size)):
+        if reference[i] != node[i]:
+            if count < max_samples:
+                out_pos[count] = i
+                out_ref[count] = reference[i]
+                out_node[count] = node[i]
+            count += 1
+    return count
+
+@lru_cache(maxsize=None)
+def _mismatch_kernel():
+    """Return _scan_mismatches compiled by numba, or None if numba is missing."""
+    try:
+        from numba import njit
+    except ImportError:  # numba is optional; fall back to plain numpy
+        return None
+    
+    # Called from find_mismatches on first use only. The explicit signature
+    # compiles right away and, with cache=True, later runs load the machine
+    # code from __pycache__ instead of re-JITting. All arrays passed in are
+    # C-contiguous, so the signature declares it for tighter loops
+    return njit("int64(int64[::1], int64[::1], int64[::1], int64[::1], int64[::1], int64)",
+                cache=True)(_scan_mismatches)
 
-def load_node_deliveries(log_dir: Path) -> Dict[str, List[dict]]:
-    """Load delivered messages from all node log files."""
-    node_data = {}
+def find_mismatches(reference: np.ndarray, node: np.ndarray,
+                    max_samples: int = 5) -> Tuple[int, List[Tuple[int, int, int]]]:
+    """Compare two batch_id arrays up to the shorter length.
+    
+    Returns the number of differing positions and (pos, expected, got)
+    samples for the first max_samples of them.
+    """
+    min_len = min(reference.size, node.size)
+    kernel = _mismatch_kernel() if min_len >= _NUMBA_MIN_LENGTH else None
+    if kernel is not None:
+        # Fused scan: no boolean mask the size of the log
+        out = np.empty((3, max_samples), dtype=np.int64)
+        count = kernel(reference, node, out[0], out[1], out[2], max_samples)
+        found = min(count, max_samples)
+        return count, list(zip(*out[:, :found].tolist()))
+    
+    positions = np.flatnonzero(reference[:min_len] != node[:min_len])
+    sample = positions[:max_samples]
+    return positions.size, list(zip(
+        sample.tolist(), reference[sample].tolist(), node[sample].tolist()))
+
+def _load_one(node_dir: Path) -> Tuple[str, List[Union[int, str]], np.ndarray]:
+    """Load a single node's log as its raw batch ids and an int64 seq array.
+    
+    Entries are reduced to these two fields as they are decoded, so no
+    per-message objects outlive the parse.
+    """
+    batch_ids = []
+    seqs = array('q')
+    delivered_file = node_dir / "delivered.jsonl"
+    if delivered_file.stat().st_size:  # mmap rejects empty files
+        # Decode straight out of the page cache rather than a read() buffer
+        with open(delivered_file, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # readline keeps the newline, so blank lines are dropped by strip()
+            for line in filter(bytes.strip, iter(mm.readline, b'')):
+                try:
+                    msg = _DECODER.decode(line)
+                except msgspec.DecodeError as e:
+                    print(f"⚠️  Warning: Failed to parse line in {node_dir.name}: {e}", file=sys.stderr)
+                    continue
+                batch_ids.append(msg.batch_id)
+                seqs.append(msg.seq)
+    
+    return node_dir.name, batch_ids, np.frombuffer(seqs, dtype=np.int64)
+
+def _numeric_batch_ids(raw_batch_ids: Dict[str, List[Union[int, str]]]) -> Optional[Dict[str, np.ndarray]]:
+    """Return per-node int64 batch_id arrays if every batch id is an int, else None."""
+    first = next((batch_ids[0] for batch_ids in raw_batch_ids.values() if batch_ids), None)
+    if not isinstance(first, int):
+        return None
+    
+    try:
+        return {
+            node: np.fromiter(map(operator.index, batch_ids), dtype=np.int64, count=len(batch_ids))
+            for node, batch_ids in raw_batch_ids.items()
+        }
+    except (TypeError, OverflowError):  # Mixed id types, or ints beyond int64
+        return None
+
+def load_node_deliveries(log_dir: Path) -> Tuple[Dict[str, NodeArrays], Optional[List[Union[int, str]]]]:
+    """Load delivered messages from all node log files.
+    
+    Returns the per-node arrays and the batch label table their
+    batch_ids index into (None when batch ids are numeric and kept as-is).
+    """
+    node_dirs = []
     
     for node_dir in sorted(log_dir.iterdir()):
         if not node_dir.is_dir():
@@ -28,187 +156,329 @@ def load_node_deliveries(log_dir: Path) -> Dict[str, List[dict]]:
             
         delivered_file = node_dir / "delivered.jsonl"
         if not delivered_file.exists():
-            print(f"⚠️  Warning: No delivered.jsonl for {node_dir.name}")
+            print(f"⚠️  Warning: No delivered.jsonl for {node_dir.name}", file=sys.stderr)
             continue
         
-        messages = []
-        with open(delivered_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line:  # Skip empty lines
-                    try:
-                        messages.append(json.loads(line))
-                    except json.JSONDecodeError as e:
-                        print(f"⚠️  Warning: Failed to parse line in {node_dir.name}: {e}")
-        
-        node_data[node_dir.name] = messages
-    
-    return node_data
+        node_dirs.append(node_dir)
+    
+    # Node files are independent, so load them concurrently;
+    # map() yields results in node_dirs (sorted) order
+    raw_batch_ids = {}
+    node_seqs = {}
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for node, batch_ids, seqs in executor.map(_load_one, node_dirs):
+            raw_batch_ids[node] = batch_ids
+            node_seqs[node] = seqs
+    
+    batch_labels = None
+    node_batch_ids = _numeric_batch_ids(raw_batch_ids)
+    if node_batch_ids is None:
+        # Encode batch ids as int64 codes into one table shared by all nodes,
+        # releasing each node's raw ids as soon as they are encoded
+        batch_codes = {}
+        node_batch_ids = {}
+        for node in list(raw_batch_ids):
+            batch_ids = raw_batch_ids.pop(node)
+            node_batch_ids[node] = np.fromiter(
+                (batch_codes.setdefault(batch_id, len(batch_codes)) for batch_id in batch_ids),
+                dtype=np.int64, count=len(batch_ids))
+        batch_labels = list(batch_codes)
+    
+    node_data = {node: NodeArrays(node_batch_ids[node], seqs) for node, seqs in node_seqs.items()}
+    return node_data, batch_labels
+
+def _batch_label(batch_labels: Optional[List[Union[int, str]]], batch: int) -> Union[int, str]:
+    """Map a stored batch_id back to the id written in the logs."""
+    return batch if batch_labels is None else batch_labels[batch]
+
+def _fingerprint(arrays: NodeArrays) -> bytes:
+    """128-bit digest of a node's delivered (batch_id, seq) sequence."""
+    digest = hashlib.blake2b(arrays.batch_ids, digest_size=16)
+    digest.update(arrays.seqs)
+    return digest.digest()
 
-def analyze_consensus(node_data: Dict[str, List[dict]]) -> None:
-    """Analyze consensus across all nodes."""
+def _write_section(lines: List[str]) -> None:
+    """Write a buffered report section in one call and reset the buffer."""
+    sys.stdout.write("\n".join(lines) + "\n")
+    lines.clear()
+
+def summarize_consensus(node_data: Dict[str, NodeArrays], batch_labels: Optional[List[Union[int, str]]]) -> dict:
+    """Analyze consensus across all nodes into a JSON-serializable summary."""
+    summary = {}
     
-    if not node_data:
-        print("❌ No node data found!")
-        return
+    # Every per-node loop and listing below follows this order
+    node_names = sorted(node_data)
     
-    print(f"\n{'='*80}")
-    print(f"BLS CONSENSUS ANALYSIS ({len(node_data)} nodes)")
-    print(f"{'='*80}\n")
+    # Nodes with byte-identical logs share every per-node result, so each
+    # distinct log is analyzed once (a healthy cluster has only one)
+    log_fingerprints = {node: _fingerprint(node_data[node]) for node in node_names}
+    distinct_logs = {}
+    for node, fingerprint in log_fingerprints.items():
+        distinct_logs.setdefault(fingerprint, node_data[node])
     
     # 1. Message count per node
-    print("📊 Message Delivery Counts:")
-    print(f"{'─'*80}")
-    counts = {node: len(msgs) for node, msgs in node_data.items()}
-    for node in sorted(counts.keys()):
-        print(f"  {node:15} : {counts[node]:4} messages")
-    
-    min_count = min(counts.values())
-    max_count = max(counts.values())
-    avg_count = sum(counts.values()) / len(counts)
-    
-    print(f"{'─'*80}")
-    print(f"  Min: {min_count} | Max: {max_count} | Avg: {avg_count:.1f}")
-    print()
+    counts = {node: node_data[node].batch_ids.size for node in node_names}
+    summary["nodes"] = counts
+    summary["min_count"] = min(counts.values())
+    summary["max_count"] = max(counts.values())
+    summary["avg_count"] = sum(counts.values()) / len(counts)
     
     # 2. Check for total consensus (all nodes have same batch_ids)
-    print("🔍 Checking Batch ID Consensus:")
-    print(f"{'─'*80}")
-    
-    node_batch_sets = {}
-    for node, msgs in node_data.items():
-        batch_ids = {msg['batch_id'] for msg in msgs}
-        node_batch_sets[node] = batch_ids
+    # Sorted unique batch ids per distinct log, so set operations can assume uniqueness
+    log_batch_sets = {}
+    for fingerprint, arrays in distinct_logs.items():
+        log_batch_sets[fingerprint] = np.unique(arrays.batch_ids)
     
     # Find the union and intersection of all batch_ids
-    all_batches = set().union(*node_batch_sets.values()) if node_batch_sets else set()
-    common_batches = set.intersection(*node_batch_sets.values()) if node_batch_sets else set()
-    
-    consensus_rate = (len(common_batches) / len(all_batches) * 100) if all_batches else 0
+    if len(log_batch_sets) == 1:
+        all_batches = common_batches = next(iter(log_batch_sets.values()))
+    else:
+        all_batches = np.unique(np.concatenate(list(log_batch_sets.values())))
+        common_batches = reduce(
+            lambda a, b: np.intersect1d(a, b, assume_unique=True), log_batch_sets.values())
     
-    print(f"  Total unique batches: {len(all_batches)}")
-    print(f"  Batches on all nodes: {len(common_batches)}")
-    print(f"  Consensus rate:       {consensus_rate:.1f}%")
+    consensus_rate = (common_batches.size / all_batches.size * 100) if all_batches.size else 0.0
     
     # Find missing batches per node
+    missing_by_log = {
+        fingerprint: np.setdiff1d(all_batches, batch_set, assume_unique=True).size
+        for fingerprint, batch_set in log_batch_sets.items()
+    }
     missing_by_node = {}
-    for node, batch_set in node_batch_sets.items():
-        missing = all_batches - batch_set
-        if missing:
-            missing_by_node[node] = missing
-    
-    if missing_by_node:
-        print(f"\n  ⚠️  Nodes missing batches:")
-        for node, missing in sorted(missing_by_node.items()):
-            print(f"     {node}: missing {len(missing)} batches")
-    else:
-        print(f"\n  ✓ All nodes have the same set of batches!")
+    for node, fingerprint in log_fingerprints.items():
+        if missing_by_log[fingerprint]:
+            missing_by_node[node] = missing_by_log[fingerprint]
     
-    print()
+    summary["total_batches"] = all_batches.size
+    summary["common_batches"] = common_batches.size
+    summary["consensus_rate"] = consensus_rate
+    summary["missing_batches"] = missing_by_node
     
     # 3. Check delivery order consistency (chain preservation)
-    print("⛓️  Checking Chain Order Consistency:")
-    print(f"{'─'*80}")
-    
     # Get the canonical order from the first node (or create one from sequence)
-    reference_node = sorted(node_data.keys())[0]
-    reference_order = [msg['batch_id'] for msg in node_data[reference_node]]
+    reference_node = node_names[0]
+    reference_order = node_data[reference_node].batch_ids
+    reference_fingerprint = log_fingerprints[reference_node]
     
     # Compare order across all nodes
     order_matches = 0
     order_mismatches = {}
+    mismatches_by_log = {}
     
-    for node, msgs in node_data.items():
-        node_order = [msg['batch_id'] for msg in msgs]
-        
-        # Only compare up to the minimum length
-        min_len = min(len(reference_order), len(node_order))
-        mismatches = []
+    for node, fingerprint in log_fingerprints.items():
+        arrays = node_data[node]
+        # A log identical to the reference (the healthy case) needs no diff;
+        # array_equal also catches equal batch_ids with differing seqs
+        if fingerprint == reference_fingerprint or np.array_equal(arrays.batch_ids, reference_order):
+            order_matches += 1
+            continue
         
-        for i in range(min_len):
-            if reference_order[i] != node_order[i]:
-                mismatches.append((i, reference_order[i], node_order[i]))
+        if fingerprint not in mismatches_by_log:
+            mismatches_by_log[fingerprint] = find_mismatches(reference_order, arrays.batch_ids)
+        mismatch_count, mismatches = mismatches_by_log[fingerprint]
         
-        if not mismatches:
+        if not mismatch_count:
             order_matches += 1
         else:
-            order_mismatches[node] = mismatches
-    
-    print(f"  Reference node: {reference_node}")
-    print(f"  Nodes with matching order: {order_matches}/{len(node_data)}")
-    
-    if order_mismatches:
-        print(f"\n  ⚠️  Order mismatches detected:")
-        for node, mismatches in sorted(order_mismatches.items()):
-            print(f"     {node}: {len(mismatches)} position(s) differ from reference")
-            if len(mismatches) <= 5:  # Show first 5 mismatches
-                for pos, ref_batch, node_batch in mismatches:
-                    print(f"       @ seq {pos}: expected {ref_batch}, got {node_batch}")
+            # First 5 mismatches as [position, expected, got]
+            order_mismatches[node] = {
+                "count": mismatch_count,
+                "samples": [
+                    [pos, _batch_label(batch_labels, ref_batch), _batch_label(batch_labels, node_batch)]
+                    for pos, ref_batch, node_batch in mismatches
+                ],
+            }
+    
+    summary["reference_node"] = reference_node
+    summary["order_matches"] = order_matches
+    summary["order_mismatches"] = order_mismatches
+    
+    # 4. Check for duplicates within each node
+    # Repeated batches and their delivery counts per distinct log, or None.
+    # The unique batch set from the consensus check already tells which
+    # logs have duplicates, so only those are counted
+    duplicates_by_log = {}
+    for fingerprint, arrays in distinct_logs.items():
+        if log_batch_sets[fingerprint].size == arrays.batch_ids.size:
+            duplicates_by_log[fingerprint] = None
+            continue
+        
+        batches, delivery_counts = np.unique(arrays.batch_ids, return_counts=True)
+        repeated = delivery_counts > 1
+        duplicates_by_log[fingerprint] = (batches[repeated], delivery_counts[repeated])
+    
+    duplicates = {}
+    for node, fingerprint in log_fingerprints.items():
+        if duplicates_by_log[fingerprint] is not None:
+            duplicated, times = duplicates_by_log[fingerprint]
+            # First 5 repeated batches as [batch_id, times delivered]
+            duplicates[node] = {
+                "count": int((times - 1).sum()),
+                "batch_ids": duplicated.size,
+                "samples": [
+                    [_batch_label(batch_labels, batch), count]
+                    for batch, count in zip(duplicated[:5].tolist(), times[:5].tolist())
+                ],
+            }
+    
+    summary["duplicates"] = duplicates
+    
+    # 5. Verify sequence numbers
+    # Missing seqs per distinct log, or None when the log numbers 1..n
+    seq_gaps_by_log = {}
+    for fingerprint, arrays in distinct_logs.items():
+        expected_seq = np.arange(1, arrays.seqs.size + 1, dtype=arrays.seqs.dtype)
+        
+        if np.array_equal(arrays.seqs, expected_seq):
+            seq_gaps_by_log[fingerprint] = None
+        else:
+            # Find gaps (seqs may repeat, so it is not assumed unique)
+            seq_gaps_by_log[fingerprint] = np.setdiff1d(expected_seq, arrays.seqs)
+    
+    seq_issues = {}
+    for node, fingerprint in log_fingerprints.items():
+        missing = seq_gaps_by_log[fingerprint]
+        if missing is not None:
+            seq_issues[node] = {"missing": missing[:10].tolist()}  # First 10
+    
+    summary["seq_issues"] = seq_issues
+    
+    # 6. Final verdict
+    if consensus_rate == 100 and not order_mismatches and not duplicates and not seq_issues:
+        summary["verdict"] = "perfect"
+    elif consensus_rate >= 95:
+        summary["verdict"] = "strong"
     else:
-        print(f"  ✓ All nodes have identical delivery order!")
+        summary["verdict"] = "partial"
+    
+    return summary
+
+def print_report(summary: dict) -> None:
+    """Print the human-readable consensus report for a summary."""
+    counts = summary["nodes"]
+    
+    lines = [f"\n{'='*80}"]
+    lines.append(f"BLS CONSENSUS ANALYSIS ({len(counts)} nodes)")
+    lines.append(f"{'='*80}\n")
+    _write_section(lines)
     
-    print()
+    # 1. Message count per node
+    lines.append("📊 Message Delivery Counts:")
+    lines.append(f"{'─'*80}")
+    for node, count in counts.items():
+        lines.append(f"  {node:15} : {count:4} messages")
+    
+    lines.append(f"{'─'*80}")
+    lines.append(f"  Min: {summary['min_count']} | Max: {summary['max_count']} | Avg: {summary['avg_count']:.1f}")
+    lines.append("")
+    _write_section(lines)
+    
+    # 2. Check for total consensus (all nodes have same batch_ids)
+    lines.append("🔍 Checking Batch ID Consensus:")
+    lines.append(f"{'─'*80}")
+    lines.append(f"  Total unique batches: {summary['total_batches']}")
+    lines.append(f"  Batches on all nodes: {summary['common_batches']}")
+    lines.append(f"  Consensus rate:       {summary['consensus_rate']:.1f}%")
+    
+    if summary["missing_batches"]:
+        lines.append(f"\n  ⚠️  Nodes missing batches:")
+        for node, missing_count in summary["missing_batches"].items():
+            lines.append(f"     {node}: missing {missing_count} batches")
+    else:
+        lines.append(f"\n  ✓ All nodes have the same set of batches!")
+    
+    lines.append("")
+    _write_section(lines)
+    
+    # 3. Check delivery order consistency (chain preservation)
+    lines.append("⛓️  Checking Chain Order Consistency:")
+    lines.append(f"{'─'*80}")
+    lines.append(f"  Reference node: {summary['reference_node']}")
+    lines.append(f"  Nodes with matching order: {summary['order_matches']}/{len(counts)}")
+    
+    if summary["order_mismatches"]:
+        lines.append(f"\n  ⚠️  Order mismatches detected:")
+        for node, mismatches in summary["order_mismatches"].items():
+            lines.append(f"     {node}: {mismatches['count']} position(s) differ from reference")
+            if mismatches["count"] <= 5:  # Show first 5 mismatches
+                for pos, ref_batch, node_batch in mismatches["samples"]:
+                    lines.append(f"       @ seq {pos}: expected {ref_batch}, got {node_batch}")
+    else:
+        lines.append(f"  ✓ All nodes have identical delivery order!")
+    
+    lines.append("")
+    _write_section(lines)
     
     # 4. Check for duplicates within each node
-    print("🔎 Checking for Duplicate Deliveries:")
-    print(f"{'─'*80}")
+    lines.append("🔎 Checking for Duplicate Deliveries:")
+    lines.append(f"{'─'*80}")
     
-    duplicates_found = False
-    for node, msgs in node_data.items():
-        batch_ids = [msg['batch_id'] for msg in msgs]
-        if len(batch_ids) != len(set(batch_ids)):
-            duplicates_found = True
-            duplicate_count = len(batch_ids) - len(set(batch_ids))
-            print(f"  ⚠️  {node}: {duplicate_count} duplicate(s)")
+    for node, duplicates in summary["duplicates"].items():
+        lines.append(f"  ⚠️  {node}: {duplicates['count']} duplicate(s) across {duplicates['batch_ids']} batch_ids")
+        for batch, count in duplicates["samples"]:
+            lines.append(f"      {batch}: delivered {count} times")
     
-    if not duplicates_found:
-        print(f"  ✓ No duplicates found on any node!")
+    if not summary["duplicates"]:
+        lines.append(f"  ✓ No duplicates found on any node!")
     
-    print()
+    lines.append("")
+    _write_section(lines)
     
     # 5. Verify sequence numbers
-    print("🔢 Checking Sequence Number Integrity:")
-    print(f"{'─'*80}")
+    lines.append("🔢 Checking Sequence Number Integrity:")
+    lines.append(f"{'─'*80}")
     
-    seq_issues = False
-    for node, msgs in node_data.items():
-        sequences = [msg['seq'] for msg in msgs]
-        expected_seq = list(range(1, len(msgs) + 1))
-        
-        if sequences != expected_seq:
-            seq_issues = True
-            print(f"  ⚠️  {node}: sequence numbers are not monotonic")
-            # Find gaps
-            missing = set(expected_seq) - set(sequences)
-            if missing:
-                print(f"      Missing: {sorted(list(missing))[:10]}")  # Show first 10
+    for node, seq_issue in summary["seq_issues"].items():
+        lines.append(f"  ⚠️  {node}: sequence numbers are not monotonic")
+        if seq_issue["missing"]:
+            lines.append(f"      Missing: {seq_issue['missing']}")
     
-    if not seq_issues:
-        print(f"  ✓ All nodes have monotonic sequence numbers!")
+    if not summary["seq_issues"]:
+        lines.append(f"  ✓ All nodes have monotonic sequence numbers!")
     
-    print()
+    lines.append("")
+    _write_section(lines)
     
     # 6. Final verdict
-    print(f"{'='*80}")
-    print("📋 FINAL VERDICT:")
-    print(f"{'='*80}")
-    
-    if consensus_rate == 100 and not order_mismatches and not duplicates_found and not seq_issues:
-        print("✅ PERFECT CONSENSUS ACHIEVED!")
-        print("   - All nodes delivered the same messages")
-        print("   - Delivery order is identical across all nodes")
-        print("   - No duplicates or sequence issues")
-        print("   - BLS signature aggregation working correctly!")
-    elif consensus_rate >= 95:
-        print("✓ STRONG CONSENSUS (>95%)")
-        print("  - Most messages were consistently delivered")
-        print("  - Minor inconsistencies may exist")
+    lines.append(f"{'='*80}")
+    lines.append("📋 FINAL VERDICT:")
+    lines.append(f"{'='*80}")
+    
+    if summary["verdict"] == "perfect":
+        lines.append("✅ PERFECT CONSENSUS ACHIEVED!")
+        lines.append("   - All nodes delivered the same messages")
+        lines.append("   - Delivery order is identical across all nodes")
+        lines.append("   - No duplicates or sequence issues")
+        lines.append("   - BLS signature aggregation working correctly!")
+    elif summary["verdict"] == "strong":
+        lines.append("✓ STRONG CONSENSUS (>95%)")
+        lines.append("  - Most messages were consistently delivered")
+        lines.append("  - Minor inconsistencies may exist")
     else:
-        print("⚠️ PARTIAL CONSENSUS")
-        print(f"  - Only {consensus_rate:.1f}% of messages achieved full consensus")
-        print("  - Review network connectivity and threshold settings")
+        lines.append("⚠️ PARTIAL CONSENSUS")
+        lines.append(f"  - Only {summary['consensus_rate']:.1f}% of messages achieved full consensus")
+        lines.append("  - Review network connectivity and threshold settings")
     
-    print(f"{'='*80}\n")
+    lines.append(f"{'='*80}\n")
+    _write_section(lines)
+
+def analyze_consensus(node_data: Dict[str, NodeArrays], batch_labels: Optional[List[Union[int, str]]]) -> None:
+    """Analyze consensus across all nodes.
+    
+    Prints the full report on a terminal; otherwise (CI, pipes, files)
+    writes the summary as a single JSON line.
+    """
+    
+    if not node_data:
+        print("❌ No node data found!", file=sys.stderr)
+        return
+    
+    summary = summarize_consensus(node_data, batch_labels)
+    
+    if sys.stdout.isatty():
+        print_report(summary)
+    else:
+        sys.stdout.buffer.write(msgspec.json.encode(summary) + b"\n")
 
 def main():
     """Main entry point."""
@@ -219,18 +489,19 @@ def main():
         log_dir = Path(__file__).parent / "logs"
     
     if not log_dir.exists():
-        print(f"❌ Error: Log directory not found: {log_dir}")
+        print(f"❌ Error: Log directory not found: {log_dir}", file=sys.stderr)
         sys.exit(1)
     
-    print(f"📁 Analyzing logs in: {log_dir}")
+    if sys.stdout.isatty():
+        print(f"📁 Analyzing logs in: {log_dir}")
     
-    node_data = load_node_deliveries(log_dir)
+    node_data, batch_labels = load_node_deliveries(log_dir)
     
     if not node_data:
-        print("❌ No node data could be loaded!")
+        print("❌ No node data could be loaded!", file=sys.stderr)
         sys.exit(1)
     
-    analyze_consensus(node_data)
+    analyze_consensus(node_data, batch_labels)
 
 if __name__ == "__main__":
     main()